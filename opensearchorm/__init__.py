@@ -1,5 +1,6 @@
 # flake8: noqa
 from .session import SearchSession
+from .async_session import AsyncSearchSession
 from .model import BaseModel
 from .query import *
 from .aggs import *
@@ -3,6 +3,8 @@ from typing import Optional
 
 
 class Aggregation(abc.ABC):
+    __slots__ = ('field',)
+
     def __init__(self, field: str) -> None:
         self.field = field
 
@@ -12,16 +14,20 @@ class Aggregation(abc.ABC):
 
 
 class MetricAggregation(Aggregation):
-    ...
+    __slots__ = ()
 
 
 class BucketAggregation(Aggregation):
+    __slots__ = ()
+
     @abc.abstractmethod
     def nested(self, child: Aggregation):
         ...
 
 
 class Terms(BucketAggregation):
+    __slots__ = ('max_buckets', 'child')
+
     def __init__(self, field: str, max_buckets: int = 100) -> None:
         super().__init__(field)
         self.max_buckets = max_buckets
@@ -44,6 +50,8 @@ class Terms(BucketAggregation):
 
 
 class Cardinality(MetricAggregation):
+    __slots__ = ()
+
     def compile(self, depth: int = 1):
         return {
             depth: {
@@ -55,6 +63,8 @@ class Cardinality(MetricAggregation):
 
 
 class Sum(MetricAggregation):
+    __slots__ = ()
+
     def compile(self, depth: int = 1):
         return {
             depth: {
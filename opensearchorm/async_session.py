@@ -0,0 +1,187 @@
+import asyncio
+from typing import List, Optional, Type, TypeVar, Union, cast
+
+from opensearchorm.model import BaseModel
+from opensearchorm.aggs import Aggregation, Cardinality, Sum, Terms
+from opensearchorm.session import (
+    SCROLL_FILTER_PATH,
+    BaseQueryExecutor,
+    Host,
+    _should_retry,
+    _throttle_delay,
+    client_defaults,
+)
+from opensearchorm.utils import compile_aggregations_parser
+
+Model = TypeVar('Model', bound=BaseModel)
+
+
+class AsyncSearchSession:
+    def __init__(
+        self,
+        hosts: Union[Host, List[Host]],
+        user: str,
+        password: str,
+        throttle_retries: int = 3,
+        throttle_backoff: float = 0.5,
+        **kwargs,
+    ) -> None:
+        """
+        Asyncio counterpart of :class:`SearchSession`, needs ``aiohttp`` installed.
+
+        :arg hosts: list of nodes, or a single node, we should connect to.
+            Node should be a dictionary ({"host": "localhost", "port": 9200}),
+            or a string in the format of ``host[:port]``.
+
+        :arg user: http auth username
+
+        :arg password: http auth password
+
+        :arg throttle_retries: how many times a request rejected with 429 Too Many Requests is retried
+
+        :arg throttle_backoff: base delay in seconds between throttled retries, doubled on each
+            attempt with random jitter
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        try:
+            from opensearchpy import AsyncOpenSearch
+        except ImportError as e:
+            raise ImportError('AsyncSearchSession needs aiohttp, install it with `pip install aiohttp`') from e
+
+        self.client = AsyncOpenSearch(
+            hosts=hosts,
+            http_auth=(user, password),
+            **client_defaults(kwargs),
+        )
+        self._throttle_retries = throttle_retries
+        self._throttle_backoff = throttle_backoff
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.client.close()
+
+    def select(self, model: Type[Model]):
+        return AsyncQueryExecutor(model, self)
+
+    async def _request(self, call, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await call(**kwargs)
+            except Exception as e:
+                if not _should_retry(e, attempt, self._throttle_retries):
+                    raise
+
+            await asyncio.sleep(_throttle_delay(self._throttle_backoff, attempt))
+            attempt += 1
+
+    async def search(self, **kwargs):
+        return await self._request(self.client.search, **kwargs)
+
+    async def scroll(self, scroll_id, lifetime):
+        body = dict(
+            scroll_id=scroll_id,
+            scroll=lifetime,
+        )
+        return await self._request(self.client.scroll, body=body, filter_path=SCROLL_FILTER_PATH)
+
+    async def count(self, **kwargs):
+        return await self._request(self.client.count, **kwargs)
+
+
+class AsyncQueryExecutor(BaseQueryExecutor[Model]):
+    """
+    Builds queries like :class:`~opensearchorm.session.QueryExecutor`, the terminal methods are coroutines,
+    so independent queries can be awaited together, e.g. with ``asyncio.gather``.
+    """
+
+    __slots__ = ()
+
+    async def fetch_fields(self, fields: List[str], **kwargs):
+        """
+        :arg fields: include source fields
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        resp = await self._session.search(**self._search_request(fields, **kwargs))
+        return [hit['_source'] for hit in self._hits(resp)]
+
+    async def fetch(self, validate: bool = True, **kwargs):
+        """
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        resp = await self._session.search(**self._search_request(**kwargs))
+        return self._parse_hits(self._hits(resp), validate)
+
+    async def scroll(self, lifetime, validate: bool = True, **kwargs):
+        """
+        :arg lifetime: how long the scroll context is kept alive, e.g. ``1m``
+
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        resp = await self._session.search(**self._search_request(scroll=lifetime, **kwargs))
+        scroll_id = resp['_scroll_id']
+        data = self._parse_hits(self._hits(resp), validate)
+        yield data
+
+        while scroll_id and data:
+            resp = await self._session.scroll(scroll_id, lifetime)
+            scroll_id = resp['_scroll_id']
+            data = self._parse_hits(self._hits(resp), validate)
+            yield data
+
+    async def iter_fetch(
+        self,
+        page_size: int = 1000,
+        validate: bool = True,
+        tiebreaker: Optional[str] = None,
+        **kwargs,
+    ):
+        """
+        Yield documents page by page with ``search_after``, see :meth:`~opensearchorm.session.QueryExecutor.iter_fetch`.
+        """
+        sort, remaining = self._page_start(tiebreaker)
+        search_after = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            resp = await self._session.search(**self._page_request(sort, size, search_after, **kwargs))
+            hits = self._hits(resp)
+            for doc in self._parse_hits(hits, validate):
+                yield doc
+
+            if len(hits) < size:
+                break
+            search_after = hits[-1]['sort']
+            if remaining is not None:
+                remaining -= len(hits)
+
+    async def aggregate(self, aggs: Aggregation, **kwargs):
+        """
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        resp = await self._session.search(**self._aggregate_request(aggs, **kwargs))
+        return compile_aggregations_parser(aggs)(resp['aggregations'])
+
+    async def unique_count(self, field: str, **kwargs) -> int:
+        resp = await self.aggregate(Cardinality(field), **kwargs)
+        return cast(int, resp)
+
+    async def sum(self, field: str, **kwargs) -> float:
+        resp = await self.aggregate(Sum(field), **kwargs)
+        return cast(float, resp)
+
+    async def count(self, **kwargs) -> int:
+        resp = await self._session.count(**self._count_request(**kwargs))
+        return resp['count']
+
+    async def group_by(self, field: str, max_buckets: int = 100):
+        return await self.aggregate(Terms(field, max_buckets))
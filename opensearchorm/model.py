@@ -1,4 +1,5 @@
-from typing import ClassVar, Optional
+import functools
+from typing import ClassVar, List, Optional, Tuple
 from pydantic import BaseModel as RawBaseModel
 
 
@@ -6,5 +7,11 @@ class BaseModel(RawBaseModel):
     __index__: ClassVar[Optional[str]] = None
 
     @classmethod
-    def default_fields(cls):
-        return list(cls.__fields__.keys())
+    def default_fields(cls) -> List[str]:
+        return list(cls._default_fields())
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _default_fields(cls) -> Tuple[str, ...]:
+        # fields are fixed at class creation, computed once per model class
+        return tuple(cls.__fields__.keys())
@@ -1,8 +1,9 @@
 import abc
+import functools
 from datetime import date, datetime
 from enum import Enum
-import logging
-from typing import Any, Callable, Dict, List, Tuple, Type, TypeVar, Union
+import operator
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type, TypeVar, Union
 
 from opensearchorm.model import BaseModel
 
@@ -10,27 +11,43 @@ Model = TypeVar('Model', bound=BaseModel)
 
 
 class Expr(abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def compile(self) -> dict:
         ...
 
 
 class Contains(Expr):
-    def __init__(self, field: str, values: list, min_match: int = 1):
+    __slots__ = ('field', 'values', 'min_match')
+
+    def __init__(self, field: str, values: Iterable[str], min_match: int = 1):
         self.field = field
-        self.values = values
+        self.values = tuple(values)
         self.min_match = min_match
 
     def compile(self):
+        field = self.field
         return {
             'bool': {
-                'should': [MatchPhrase(self.field, v).compile() for v in self.values],
+                'should': [{'match_phrase': {field: v}} for v in self.values],
                 'minimum_should_match': self.min_match,
             }
         }
 
 
+# (left_open, right_open) -> (left operator, right operator)
+_RANGE_OPERATORS = {
+    (False, False): ('gte', 'lte'),
+    (True, False): ('gt', 'lte'),
+    (False, True): ('gte', 'lt'),
+    (True, True): ('gt', 'lt'),
+}
+
+
 class Range(Expr):
+    __slots__ = ('field', 'interval', 'left_open', 'right_open')
+
     def __init__(self, field: str, interval: Tuple[Any, Any], *, left_open: bool = False, right_open: bool = False):
         self.field = field
         self.interval = interval
@@ -44,13 +61,12 @@ class Range(Expr):
         if isinstance(right, (date, datetime)):
             right = right.isoformat()
 
+        left_op, right_op = _RANGE_OPERATORS[self.left_open, self.right_open]
         range = {}
         if left is not None:
-            op = 'gt' if self.left_open else 'gte'
-            range[op] = left
+            range[left_op] = left
         if right is not None:
-            op = 'lt' if self.right_open else 'lte'
-            range[op] = right
+            range[right_op] = right
 
         return {
             'range': {
@@ -60,6 +76,8 @@ class Range(Expr):
 
 
 class MatchPhrase(Expr):
+    __slots__ = ('field', 'value')
+
     def __init__(self, field: str, value: str):
         self.field = field
         self.value = value
@@ -73,6 +91,8 @@ class MatchPhrase(Expr):
 
 
 class MatchPhrasePrefix(Expr):
+    __slots__ = ('field', 'value')
+
     def __init__(self, field: str, value: str):
         self.field = field
         self.value = value
@@ -86,6 +106,8 @@ class MatchPhrasePrefix(Expr):
 
 
 class Wildcard(Expr):
+    __slots__ = ('field', 'value')
+
     def __init__(self, field: str, value: str):
         self.field = field
         self.value = value
@@ -99,6 +121,8 @@ class Wildcard(Expr):
 
 
 class RegExp(Expr):
+    __slots__ = ('field', 'value')
+
     def __init__(self, field: str, value: str):
         self.field = field
         self.value = value
@@ -111,18 +135,38 @@ class RegExp(Expr):
         }
 
 
+class TermsIn(Expr):
+    __slots__ = ('field', 'values')
+
+    def __init__(self, field: str, values: Iterable[Any]):
+        self.field = field
+        self.values = tuple(values)
+
+    def compile(self):
+        # one exact-value terms query instead of a should clause per value
+        return {
+            'terms': {
+                self.field: list(self.values),
+            }
+        }
+
+
 class Operator(Enum):
     PREFIX = '__prefix'
     REGEXP = '__regexp'
     CONTAINS = '__contains'
+    IN = '__in'
     GTE = '__gte'
     GT = '__gt'
     LTE = '__lte'
     LT = '__lt'
 
 
+_COLLECTION_TYPES = (list, tuple, set, frozenset)
+
 OPERATOR_FUNCTIONS: Dict[Operator, Callable[[str, Any], Expr]] = {
-    Operator.CONTAINS: lambda field, value: Contains(field, value if isinstance(value, list) else [value]),
+    Operator.CONTAINS: lambda field, value: Contains(field, value if isinstance(value, _COLLECTION_TYPES) else [value]),
+    Operator.IN: lambda field, value: TermsIn(field, value if isinstance(value, _COLLECTION_TYPES) else [value]),
     Operator.PREFIX: lambda field, value: MatchPhrasePrefix(field, value),
     Operator.REGEXP: lambda field, value: RegExp(field, value),
     Operator.GTE: lambda field, value: Range(field, (value, None)),
@@ -131,44 +175,96 @@ OPERATOR_FUNCTIONS: Dict[Operator, Callable[[str, Any], Expr]] = {
     Operator.LT: lambda field, value: Range(field, (None, value), right_open=True),
 }
 
+_compile = operator.methodcaller('compile')
+
+
+@functools.lru_cache(maxsize=None)
+def _valid_fields(model_cls: Type[BaseModel]) -> FrozenSet[str]:
+    return frozenset(model_cls._default_fields())
+
+
+@functools.lru_cache(maxsize=None)
+def _clause_factories(model_cls: Type[BaseModel]) -> Dict[str, Tuple[str, Callable[[str, Any], Expr]]]:
+    # every `field` and `field__operator` name of the model, resolved once per class
+    fields = _valid_fields(model_cls)
+    factories: Dict[str, Tuple[str, Callable[[str, Any], Expr]]] = {field: (field, MatchPhrase) for field in fields}
+    for field in fields:
+        for op, factory in OPERATOR_FUNCTIONS.items():
+            factories[field + op.value] = (field, factory)
+    return factories
+
 
 class ModelQuery(Expr):
+    """
+    Expressions added to a query are treated as immutable, build a new expression
+    instead of changing one that was already added.
+    """
+
+    __slots__ = ('_version', '_cached', '__model_cls', '__filter', '__exclude', '__union', '__nested')
+
     def __init__(self, model_cls: Type[Model]):
+        # bumped by filter, union and exclude, the cached body is keyed on it
+        self._version = 0
+        self._cached: Optional[Tuple[tuple, dict]] = None
         self.__model_cls = model_cls
         self.__filter: List[Expr] = []
         self.__exclude: List[Expr] = []
         self.__union: List[Expr] = []
+        self.__nested: List[ModelQuery] = []
 
     def compile(self):
+        # empty clauses are left out, a bool query without clauses matches everything
+        body = {}
+        if self.__exclude:
+            body['must_not'] = list(map(_compile, self.__exclude))
+        if self.__union:
+            body['should'] = list(map(_compile, self.__union))
+        if self.__filter:
+            body['filter'] = list(map(_compile, self.__filter))
+        if self.__union:
+            body['minimum_should_match'] = 1
+
         return {
-            'bool': {
-                'must_not': [e.compile() for e in self.__exclude],
-                'should': [e.compile() for e in self.__union],
-                'filter': [e.compile() for e in self.__filter],
-                'minimum_should_match': 1 if self.__union else 0,
-            }
+            'bool': body,
         }
 
+    def _state(self) -> tuple:
+        return (self._version, *map(ModelQuery._state, self.__nested))
+
+    def _cached_compile(self) -> dict:
+        """
+        Like :meth:`compile`, but the body is reused until this query or a nested one gets new clauses.
+        The result is shared, only pass it on to the client.
+        """
+        state = self._state()
+        cached = self._cached
+        if cached is None or cached[0] != state:
+            cached = self._cached = (state, self.compile())
+        return cached[1]
+
+    def _add(self, clauses: List[Expr], args: Tuple[Expr, ...], conditions: List[Expr]):
+        clauses.extend(args)
+        clauses.extend(conditions)
+        self.__nested.extend(arg for arg in args if isinstance(arg, ModelQuery))
+        self._version += 1
+
     @property
     def valid_fields(self):
-        # todo @functools.cached_property, not supported in python3.7
-        return set(self.__model_cls.default_fields())
+        # a fresh set, callers may change it
+        return set(_valid_fields(self.__model_cls))
 
     def check_valid_field(self, field: str):
-        assert field in self.valid_fields, f'check field name: {field}'
+        assert field in _valid_fields(self.__model_cls), f'check field name: {field}'
 
     def parse_clause(self, raw_field: str, value) -> Expr:
-        field = raw_field
-        for op in Operator:
-            suffix: str = op.value
-            if raw_field.endswith(suffix):
-                field, _ = raw_field.rsplit(suffix)
-                logging.debug('parse field: %s, raw: %s', field, raw_field)
-                self.check_valid_field(field)
-                return OPERATOR_FUNCTIONS[op](field, value)
-
-        self.check_valid_field(field)
-        return MatchPhrase(field, value)
+        resolved = _clause_factories(self.__model_cls).get(raw_field)
+        if resolved is None:
+            # every field and field__operator name of the model is in the table,
+            # raised explicitly so it isn't skipped under `python -O`
+            raise AssertionError(f'check field name: {raw_field}')
+
+        field, factory = resolved
+        return factory(field, value)
 
     def parse_clauses(self, **kwargs):
         clauses = []
@@ -179,21 +275,18 @@ class ModelQuery(Expr):
 
     def filter(self, *args: Expr, **kwargs):
         conditions = self.parse_clauses(**kwargs)
-        self.__filter.extend(args)
-        self.__filter.extend(conditions)
+        self._add(self.__filter, args, conditions)
 
         return self
 
     def union(self, *args: Expr, **kwargs):
         conditions = self.parse_clauses(**kwargs)
-        self.__union.extend(args)
-        self.__union.extend(conditions)
+        self._add(self.__union, args, conditions)
 
         return self
 
     def exclude(self, *args: Expr, **kwargs):
         conditions = self.parse_clauses(**kwargs)
-        self.__exclude.extend(args)
-        self.__exclude.extend(conditions)
+        self._add(self.__exclude, args, conditions)
 
         return self
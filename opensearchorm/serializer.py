@@ -0,0 +1,39 @@
+from typing import Optional
+
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonSerializer(JSONSerializer):
+    # aggregation bodies are keyed by integer depth
+    OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def loads(self, s):
+        try:
+            return orjson.loads(s)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data):
+        # don't serialize strings
+        if isinstance(data, str):
+            return data
+
+        try:
+            # msearch bodies are joined as text, so return str rather than bytes
+            return orjson.dumps(data, default=self.default, option=self.OPTIONS).decode()
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
+
+
+def default_serializer() -> Optional[JSONSerializer]:
+    """
+    Use orjson to encode and decode request bodies when it is installed,
+    otherwise leave opensearch-py's default json serializer in place.
+    """
+    return OrjsonSerializer() if orjson else None
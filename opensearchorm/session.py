@@ -1,20 +1,120 @@
+import copy
 import json
 import logging
-from typing import Generic, List, Union, Optional, Type, TypeVar, cast
-
-from opensearchpy import OpenSearch
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Generic, Hashable, List, Tuple, Union, Optional, Type, TypeVar, cast
 
 from opensearchorm.model import BaseModel
 from opensearchorm.query import ModelQuery, Expr
-from opensearchorm.aggs import Aggregation, Sum, Cardinality, Terms
-from opensearchorm.utils import parse_aggregations
+from opensearchorm.aggs import Aggregation, Cardinality, Sum, Terms
+from opensearchorm.utils import TTLCache, compile_aggregations_parser
+
+# opensearchpy is imported where a request is made, building queries doesn't pay for it
+if TYPE_CHECKING:
+    from opensearchpy import OpenSearch
+
+logger = logging.getLogger(__name__)
 
 Host = Union[str, dict]
+
+# trim the response envelope server side, only what the parsers read is sent back
+FETCH_FILTER_PATH = 'hits.hits._source'
+SCROLL_FILTER_PATH = '_scroll_id,hits.hits._source'
+PAGE_FILTER_PATH = 'hits.hits._source,hits.hits.sort'
 Model = TypeVar('Model', bound=BaseModel)
 
+# clients are shared by sessions with the same connection arguments,
+# so their connection pools survive short-lived sessions
+_client_cache: Dict[Hashable, 'OpenSearch'] = {}
+# sessions holding each shared client, it is closed on dispose once none are left
+_client_users: Dict[Hashable, int] = {}
+_client_cache_lock = threading.Lock()
+
+
+def _freeze(value: Any) -> Any:
+    # tagged, so a dict and a tuple of its items don't freeze to the same key
+    if isinstance(value, dict):
+        return dict, tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple, tuple(_freeze(v) for v in value)
+    return value
+
+
+def _client_key(hosts, user: str, password: str, kwargs: dict) -> Optional[Hashable]:
+    try:
+        key = (_freeze(hosts), user, password, _freeze(kwargs))
+        hash(key)
+    except TypeError:
+        # unsortable or unhashable connection arguments, don't share the client
+        return None
+    return key
+
+
+def _request_key(api: str, kwargs: dict) -> Optional[Hashable]:
+    try:
+        return api, json.dumps(kwargs, sort_keys=True, default=str)
+    except TypeError:
+        # keys of mixed types can't be sorted, don't cache the response
+        return None
+
+
+def _with_sort_path(filter_path: Union[str, List[str]]) -> str:
+    # search_after is read from the sort values of the last hit
+    paths = filter_path.split(',') if isinstance(filter_path, str) else list(filter_path)
+    if 'hits.hits.sort' not in paths:
+        paths.append('hits.hits.sort')
+    return ','.join(paths)
+
+
+def _should_retry(error: Exception, attempt: int, retries: int) -> bool:
+    from opensearchpy.exceptions import TransportError
+
+    # only 429 Too Many Requests, anything else is raised right away
+    return isinstance(error, TransportError) and error.status_code == 429 and attempt < retries
+
+
+def _throttle_delay(backoff: float, attempt: int) -> float:
+    # jittered, so throttled clients don't come back in lockstep
+    return backoff * 2**attempt * (1 + random.random())
+
+
+def client_defaults(kwargs: dict) -> dict:
+    """
+    Fill in the client arguments this package defaults to, explicit arguments win.
+    """
+    kwargs = dict(kwargs)
+    from opensearchorm.serializer import default_serializer
+
+    serializer = default_serializer()
+    if serializer:
+        kwargs.setdefault('serializer', serializer)
+    # keep enough connections per node for threaded callers,
+    # a busy pool opens and discards a fresh (TLS) connection per extra request
+    kwargs.setdefault('maxsize', 32)
+    kwargs.setdefault('http_compress', True)
+    # ask for compressed responses even when request compression is turned off,
+    # large _source pages are mostly repetitive json
+    headers = dict(kwargs.get('headers') or {})
+    if not any(key.lower() == 'accept-encoding' for key in headers):
+        headers['accept-encoding'] = 'gzip,deflate'
+    kwargs['headers'] = headers
+    return kwargs
+
 
 class SearchSession:
-    def __init__(self, hosts: Union[Host, List[Host]], user: str, password: str, **kwargs) -> None:
+    def __init__(
+        self,
+        hosts: Union[Host, List[Host]],
+        user: str,
+        password: str,
+        cache_ttl: Optional[float] = None,
+        throttle_retries: int = 3,
+        throttle_backoff: float = 0.5,
+        **kwargs,
+    ) -> None:
         """
         :arg hosts: list of nodes, or a single node, we should connect to.
             Node should be a dictionary ({"host": "localhost", "port": 9200}),
@@ -26,65 +126,225 @@ class SearchSession:
 
         :arg password: http auth password
 
-        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        :arg cache_ttl: cache search and count responses for this many seconds,
+            identical requests within the ttl are answered without a round trip.
+            Responses are not cached by default.
+
+        :arg throttle_retries: how many times a request rejected with 429 Too Many Requests is retried
+
+        :arg throttle_backoff: base delay in seconds between throttled retries, doubled on each
+            attempt with random jitter. 502/503/504 are retried by the transport itself, timeouts
+            only with ``retry_on_timeout=True``, which can skip a page when a scroll is retried.
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call,
+            e.g. ``maxsize`` sets the number of pooled connections per node (default 32).
+            A larger pool keeps more idle sockets open on both ends.
+
+        Sessions created with the same arguments share one client and its connection pool.
         """
-        self.client = OpenSearch(
+        key = _client_key(hosts, user, password, kwargs)
+        with _client_cache_lock:
+            client = _client_cache.get(key) if key is not None else None
+            if client is None:
+                client = self._create_client(hosts, user, password, **kwargs)
+                if key is not None:
+                    _client_cache[key] = client
+            if key is not None:
+                _client_users[key] = _client_users.get(key, 0) + 1
+
+        self.client = client
+        self._client_key = key
+        self._released = False
+        self._response_cache = TTLCache(cache_ttl) if cache_ttl else None
+        self._throttle_retries = throttle_retries
+        self._throttle_backoff = throttle_backoff
+
+    @staticmethod
+    def _create_client(hosts: Union[Host, List[Host]], user: str, password: str, **kwargs) -> 'OpenSearch':
+        from opensearchpy import OpenSearch
+
+        return OpenSearch(
             hosts=hosts,
             http_auth=(user, password),
-            http_compress=True,
-            **kwargs,
+            **client_defaults(kwargs),
         )
 
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
+        # shared clients stay open for the next session
+        if self._client_key is None:
+            self.client.close()
+            return
+        with _client_cache_lock:
+            self._release()
+
+    def _release(self) -> int:
+        # called with the cache lock held, returns how many sessions still hold the client
+        users = _client_users.get(self._client_key, 0)
+        if not self._released and users:
+            users -= 1
+            _client_users[self._client_key] = users
+        self._released = True
+        return users
+
+    def dispose(self):
+        """
+        Close the client once no other session holds it, a shared client is also
+        dropped from the cache so later sessions reconnect.
+        """
+        if self._client_key is not None:
+            with _client_cache_lock:
+                if self._release() or _client_cache.get(self._client_key) is not self.client:
+                    return
+                del _client_cache[self._client_key]
+                del _client_users[self._client_key]
         self.client.close()
 
     def select(self, model: Type[Model]):
         return QueryExecutor(model, self)
 
+    def _request(self, call, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return call(**kwargs)
+            except Exception as e:
+                if not _should_retry(e, attempt, self._throttle_retries):
+                    raise
+
+            time.sleep(_throttle_delay(self._throttle_backoff, attempt))
+            attempt += 1
+
+    def _cached(self, api: str, call, kwargs: dict):
+        key = _request_key(api, kwargs) if self._response_cache is not None else None
+        if key is None:
+            return self._request(call, **kwargs)
+
+        # callers own the returned response, the cache keeps a private copy
+        resp = self._response_cache.get(key)
+        if resp is None:
+            resp = self._request(call, **kwargs)
+            self._response_cache.set(key, copy.deepcopy(resp))
+            return resp
+        return copy.deepcopy(resp)
+
     def search(self, **kwargs):
-        return self.client.search(**kwargs)
+        # scroll contexts are stateful, never replay them from the cache
+        if 'scroll' in kwargs:
+            return self._request(self.client.search, **kwargs)
+        return self._cached('search', self.client.search, kwargs)
 
     def scroll(self, scroll_id, lifetime):
         body = dict(
             scroll_id=scroll_id,
             scroll=lifetime,
         )
-        return self.client.scroll(body=body)
+        return self._request(self.client.scroll, body=body, filter_path=SCROLL_FILTER_PATH)
 
     def count(self, **kwargs):
-        return self.client.count(**kwargs)
+        return self._cached('count', self.client.count, kwargs)
+
+    def fetch_many(self, executors: List['QueryExecutor'], validate: bool = True, **kwargs) -> List[list]:
+        """
+        Fetch the results of several executors with a single ``_msearch`` request.
 
+        :arg executors: executors built by :meth:`select`, results are returned in the same order
 
-class QueryExecutor(Generic[Model]):
-    def __init__(self, model_cls: Type[Model], session: SearchSession):
-        self.__query = ModelQuery(model_cls)
-        self.__model_cls = model_cls
-        self.__limit: Optional[int] = None
-        self.__offset: Optional[int] = None
-        self.__sort: list = []
-        self.__session = session
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        if not executors:
+            return []
+
+        body: List[dict] = []
+        for executor in executors:
+            body.extend(executor._msearch_request())
+
+        resp = self._request(self.client.msearch, body=body, **kwargs)
+        return [
+            executor._parse_msearch_response(r, validate)
+            for executor, r in zip(executors, resp['responses'])
+        ]
+
+    def multi_select(
+        self,
+        queries: List[Tuple[Type[BaseModel], Optional[dict]]],
+        validate: bool = True,
+        **kwargs,
+    ) -> List[list]:
+        """
+        Fetch documents of several models in a single ``_msearch`` request.
+
+        :arg queries: ``(model, filters)`` pairs, filters are django-like lookups passed to
+            :meth:`QueryExecutor.filter`, results are returned in the same order
+
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        executors = [self.select(model).filter(**(filters or {})) for model, filters in queries]
+        return self.fetch_many(executors, validate=validate, **kwargs)
+
+
+class BaseQueryExecutor(Generic[Model]):
+    """
+    Builds the query and the request arguments, subclasses send them through a sync or async session.
+    """
+
+    __slots__ = (
+        '_query',
+        '_model_cls',
+        '_index',
+        '_limit',
+        '_offset',
+        '_sort',
+        '_session',
+        '_raw',
+    )
+
+    def __init__(self, model_cls: Type[Model], session: Any):
+        if not (model_cls and model_cls.__index__):
+            # a missing index would search every index
+            raise TypeError('model has no index')
+        self._query = ModelQuery(model_cls)
+        self._model_cls = model_cls
+        self._index = model_cls.__index__
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+        self._sort: list = []
+        self._session = session
+        self._raw = False
 
     def filter(self, *args: Expr, **kwargs):
-        self.__query.filter(*args, **kwargs)
+        self._query.filter(*args, **kwargs)
         return self
 
     def union(self, *args: Expr, **kwargs):
-        self.__query.union(*args, **kwargs)
+        self._query.union(*args, **kwargs)
         return self
 
     def exclude(self, *args: Expr, **kwargs):
-        self.__query.exclude(*args, **kwargs)
+        self._query.exclude(*args, **kwargs)
         return self
 
     def limit(self, limit: int):
-        self.__limit = limit
+        self._limit = limit
         return self
 
     def offset(self, offset: int):
-        self.__offset = offset
+        self._offset = offset
+        return self
+
+    def raw(self):
+        """
+        Return the ``_source`` dicts of documents instead of model instances, skipping pydantic entirely.
+        """
+        self._raw = True
         return self
 
     def order_by(self, *fields: str):
@@ -93,35 +353,122 @@ class QueryExecutor(Generic[Model]):
             order = 'desc' if field.startswith('-') else 'asc'
             field = field.strip('+-')
             sort.append({field: order})
-        self.__sort = sort
+        self._sort = sort
         return self
 
-    def _search(self, fields: List[str], **kwargs):
+    def _build_body(self, **extra) -> dict:
+        body = {
+            'query': self._query._cached_compile(),
+            **extra,
+        }
+        # only pay for the dump when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('query:\n%s', json.dumps(body))
+        return body
+
+    def _search_request(self, fields: Optional[List[str]] = None, **kwargs) -> dict:
         """
-        :arg fields: include source fields
+        :arg fields: include source fields, defaults to the model fields
 
         :arg kwargs: any additional arguments will be passed on to the opensearch-py call
         """
+        kwargs.setdefault('filter_path', SCROLL_FILTER_PATH if 'scroll' in kwargs else FETCH_FILTER_PATH)
+        return dict(
+            body=self._build_body(sort=self._sort),
+            index=self._index,
+            size=self._limit,
+            from_=self._offset,
+            _source_includes=self._model_cls._default_fields() if fields is None else fields,
+            **kwargs,
+        )
 
-        body = {
-            'query': self.__query.compile(),
-            'sort': self.__sort,
+    @staticmethod
+    def _hits(resp: dict) -> List[dict]:
+        # filter_path drops the hits envelope entirely when nothing matched
+        hits = resp.get('hits', {}).get('hits', [])
+        # a page can be megabytes of json, only format a truncated repr when debug is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('raw result: %.500s', hits)
+        return hits
+
+    def _parse_hits(self, hits: List[dict], validate: bool) -> list:
+        if self._raw:
+            return [hit['_source'] for hit in hits]
+
+        model = self._model_cls
+        if validate:
+            return [model.parse_obj(hit['_source']) for hit in hits]
+        # trusted documents, skip pydantic validation
+        return [model.construct(**hit['_source']) for hit in hits]
+
+    def _msearch_request(self) -> Tuple[dict, dict]:
+        # search parameters go into the body, msearch headers only take the index
+        extra = {
+            'sort': self._sort,
+            '_source': self._model_cls.default_fields(),
         }
-        logging.debug('query:\n%s', json.dumps(body))
+        if self._limit is not None:
+            extra['size'] = self._limit
+        if self._offset is not None:
+            extra['from'] = self._offset
 
-        model = self.__model_cls
-        assert model and model.__index__, 'model has no index'
+        return {'index': self._index}, self._build_body(**extra)
 
-        resp = self.__session.search(
-            body=body,
-            index=model.__index__,
-            size=self.__limit,
-            from_=self.__offset,
-            _source_includes=fields,
+    def _parse_msearch_response(self, resp: dict, validate: bool) -> List[Model]:
+        error = resp.get('error')
+        if error:
+            from opensearchpy.exceptions import TransportError
+
+            raise TransportError(resp.get('status', 'N/A'), error.get('type'), error)
+        return self._parse_hits(self._hits(resp), validate)
+
+    def _page_start(self, tiebreaker: Optional[str]) -> Tuple[list, Optional[int]]:
+        """
+        :return: the sort ending with the tiebreaker, and the total number of documents to fetch
+        """
+        assert self._offset is None, 'search_after pagination does not support offset'
+        sort = self._sort
+        if tiebreaker is not None and not any(tiebreaker in s for s in sort):
+            sort = [*sort, {tiebreaker: 'asc'}]
+        if not sort:
+            raise ValueError('search_after pagination needs a sort, call order_by or pass a tiebreaker field')
+        return sort, self._limit
+
+    def _page_request(self, sort: list, size: int, search_after: Optional[list], **kwargs) -> dict:
+        extra = {'sort': sort}
+        if search_after is not None:
+            extra['search_after'] = search_after
+
+        kwargs['filter_path'] = _with_sort_path(kwargs.get('filter_path', PAGE_FILTER_PATH))
+        return dict(
+            body=self._build_body(**extra),
+            index=self._index,
+            size=size,
+            _source_includes=self._model_cls._default_fields(),
             **kwargs,
         )
 
-        return resp
+    def _aggregate_request(self, aggs: Aggregation, **kwargs) -> dict:
+        return dict(
+            body=self._build_body(aggs=aggs.compile(depth=1)),
+            index=self._index,
+            size=0,
+            **kwargs,
+        )
+
+    def _count_request(self, **kwargs) -> dict:
+        return dict(
+            body=self._build_body(),
+            index=self._index,
+            **kwargs,
+        )
+
+
+class QueryExecutor(BaseQueryExecutor[Model]):
+    __slots__ = ()
+
+    def _search(self, fields: Optional[List[str]] = None, **kwargs):
+        return self._session.search(**self._search_request(fields, **kwargs))
 
     def fetch_fields(self, fields: List[str], **kwargs):
         """
@@ -131,64 +478,90 @@ class QueryExecutor(Generic[Model]):
         """
 
         resp = self._search(fields, **kwargs)
+        return [hit['_source'] for hit in self._hits(resp)]
 
-        hits = resp['hits']['hits']
-        logging.debug('raw result: %s', hits)
-        return [hit['_source'] for hit in hits]
-
-    def fetch(self, **kwargs):
+    def fetch(self, validate: bool = True, **kwargs):
         """
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
+
         :arg kwargs: any additional arguments will be passed on to the opensearch-py call
         """
-        model = self.__model_cls
-        hits = self.fetch_fields(model.default_fields(), **kwargs)
-        return [model.parse_obj(hit) for hit in hits]
+        resp = self._search(**kwargs)
+        return self._parse_hits(self._hits(resp), validate)
+
+    def scroll(self, lifetime, validate: bool = True, **kwargs):
+        """
+        :arg lifetime: how long the scroll context is kept alive, e.g. ``1m``
 
-    def scroll(self, lifetime, **kwargs):
-        model = self.__model_cls
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
 
-        resp = self._search(model.default_fields(), scroll=lifetime, **kwargs)
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        resp = self._search(scroll=lifetime, **kwargs)
 
         scroll_id = resp['_scroll_id']
-        hits = resp['hits']['hits']
-        logging.debug('raw result: %s', hits)
-        hits = [hit['_source'] for hit in hits]
-        data = [model.parse_obj(hit) for hit in hits]
-
-        yield data
-
-        while scroll_id and data:
-            resp = self.__session.scroll(scroll_id, lifetime)
-            scroll_id = resp['_scroll_id']
-            hits = resp['hits']['hits']
-            logging.debug('scroll raw result: %s', hits)
-            hits = [hit['_source'] for hit in hits]
-            data = [model.parse_obj(hit) for hit in hits]
-            yield data
+        data = self._parse_hits(self._hits(resp), validate)
+
+        # request the next page before handing out the current one,
+        # so the download overlaps with the caller's processing
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while True:
+                next_page = None
+                if scroll_id and data:
+                    next_page = executor.submit(self._session.scroll, scroll_id, lifetime)
+                yield data
+
+                if next_page is None:
+                    break
+                resp = next_page.result()
+                scroll_id = resp['_scroll_id']
+                data = self._parse_hits(self._hits(resp), validate)
+
+    def iter_fetch(
+        self,
+        page_size: int = 1000,
+        validate: bool = True,
+        tiebreaker: Optional[str] = None,
+        **kwargs,
+    ):
+        """
+        Yield documents page by page with ``search_after``, only one page is held in memory.
+        ``limit`` caps the total number of documents.
+
+        :arg page_size: number of documents requested per page
+
+        :arg validate: validate documents with the model, set to False to
+            construct models from trusted documents without validation
+
+        :arg tiebreaker: a unique field with doc values, e.g. a keyword id, added to the sort
+            so documents with equal sort values are neither skipped nor repeated between pages.
+            Without it the ``order_by`` sort itself must be unique.
+
+        :arg kwargs: any additional arguments will be passed on to the opensearch-py call
+        """
+        sort, remaining = self._page_start(tiebreaker)
+        search_after = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            resp = self._session.search(**self._page_request(sort, size, search_after, **kwargs))
+            hits = self._hits(resp)
+            yield from self._parse_hits(hits, validate)
+
+            if len(hits) < size:
+                break
+            search_after = hits[-1]['sort']
+            if remaining is not None:
+                remaining -= len(hits)
 
     def aggregate(self, aggs: Aggregation, **kwargs):
         """
         :arg kwargs: any additional arguments will be passed on to the opensearch-py call
         """
 
-        body = {
-            'query': self.__query.compile(),
-            'aggs': aggs.compile(depth=1),
-        }
-        logging.debug('query:\n%s', json.dumps(body))
-
-        model = self.__model_cls
-        assert model and model.__index__, 'model has no index'
-
-        resp = self.__session.search(
-            body=body,
-            index=model.__index__,
-            size=0,
-            **kwargs,
-        )
-
-        data = resp['aggregations']
-        return parse_aggregations(data, depth=1)
+        resp = self._session.search(**self._aggregate_request(aggs, **kwargs))
+        return compile_aggregations_parser(aggs)(resp['aggregations'])
 
     def unique_count(self, field: str, **kwargs) -> int:
         resp = self.aggregate(Cardinality(field), **kwargs)
@@ -199,19 +572,7 @@ class QueryExecutor(Generic[Model]):
         return cast(int, resp)
 
     def count(self, **kwargs) -> int:
-        body = {
-            'query': self.__query.compile(),
-        }
-        logging.debug('query:\n%s', json.dumps(body))
-
-        model = self.__model_cls
-        assert model and model.__index__, 'model has no index'
-
-        resp = self.__session.count(
-            body=body,
-            index=model.__index__,
-            **kwargs,
-        )
+        resp = self._session.count(**self._count_request(**kwargs))
         return resp['count']
 
     def group_by(self, field: str, max_buckets: int = 100):
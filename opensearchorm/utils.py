@@ -1,17 +1,120 @@
+import functools
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from opensearchorm.aggs import Aggregation, BucketAggregation
+
+_DEPTH_KEYS = tuple(sys.intern(str(i)) for i in range(32))
+
+
+def _depth_key(depth: int) -> str:
+    return _DEPTH_KEYS[depth] if depth < len(_DEPTH_KEYS) else str(depth)
+
+
+def _parse_level(level: dict, depth: int, stack: List[Tuple[dict, int, dict, object]]):
+    if 'buckets' not in level:
+        return level['value']
+
+    result = {}
+    for b in level['buckets']:
+        key = b['key']
+        # bucket count, replaced by the nested result once it is parsed
+        result[key] = b['doc_count']
+        stack.append((b, depth + 1, result, key))
+    return result
+
+
 def parse_aggregations(data: dict, depth: int = 1):
-    level = data.get(str(depth), None)
+    level = data.get(_depth_key(depth), None)
     if level is None:
         return
 
-    if 'buckets' in level:
-        result = {}
-        buckets = level['buckets']
-        for b in buckets:
-            key = b['key']
-            count = b['doc_count']
-            children = parse_aggregations(b, depth + 1)
-            result[key] = children if children else count
-        return result
-    else:
-        value = level['value']
-        return value
+    stack: List[Tuple[dict, int, dict, object]] = []
+    result = _parse_level(level, depth, stack)
+    while stack:
+        bucket, depth, parent, key = stack.pop()
+        level = bucket.get(_depth_key(depth), None)
+        if level is None:
+            continue
+        children = _parse_level(level, depth, stack)
+        if children:
+            parent[key] = children
+
+    return result
+
+
+AggregationParser = Callable[[dict], Any]
+
+
+@functools.lru_cache(maxsize=None)
+def _shape_parser(shape: Tuple[bool, ...], depth: int) -> AggregationParser:
+    key = _depth_key(depth)
+    if not shape[0]:
+
+        def parse_metric(data: dict):
+            level = data.get(key)
+            return None if level is None else level['value']
+
+        return parse_metric
+
+    child: Optional[AggregationParser] = _shape_parser(shape[1:], depth + 1) if len(shape) > 1 else None
+
+    def parse_buckets(data: dict):
+        level = data.get(key)
+        if level is None:
+            return None
+        if child is None:
+            return {b['key']: b['doc_count'] for b in level['buckets']}
+        return {b['key']: child(b) or b['doc_count'] for b in level['buckets']}
+
+    return parse_buckets
+
+
+def compile_aggregations_parser(aggs: Aggregation) -> AggregationParser:
+    """
+    Build a parser specialized for the shape of ``aggs``, its output equals :func:`parse_aggregations`.
+    Parsers are cached by shape, so repeated aggregations of the same shape reuse one.
+    """
+    shape: List[bool] = []
+    agg: Optional[Aggregation] = aggs
+    while agg is not None:
+        is_bucket = isinstance(agg, BucketAggregation)
+        shape.append(is_bucket)
+        agg = getattr(agg, 'child', None) if is_bucket else None
+    return _shape_parser(tuple(shape), 1)
+
+
+class TTLCache:
+    """
+    A small thread-safe cache whose entries expire ``ttl`` seconds after they are stored.
+    When ``maxsize`` is reached, expired entries are dropped first, then the oldest ones.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._data) >= self.maxsize:
+                self._data = {k: item for k, item in self._data.items() if item[0] >= now}
+                while len(self._data) >= self.maxsize:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (now + self.ttl, value)
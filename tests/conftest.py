@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from opensearchorm import BaseModel, SearchSession
+
+
+class UserLog(BaseModel):
+    __index__ = 'user_access_log-*'
+
+    method: str
+    path: str
+    created: datetime
+
+
+DOCS = [
+    {'method': 'GET', 'path': f'/{i}', 'created': '2022-09-01T00:00:00'}
+    for i in range(5)
+]
+
+
+class FakeClient:
+    """
+    Stands in for the opensearch-py client, records every call and pages DOCS by size and search_after,
+    or by size and scroll id.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    def search(self, **kwargs):
+        self.calls.append(('search', kwargs))
+        start = (kwargs['body'].get('search_after') or [-1])[0] + 1
+        size = kwargs.get('size')
+        size = len(DOCS) if size is None else size
+        if 'scroll' in kwargs:
+            self.scroll_size = size
+            return self._scroll_page(start, size)
+        return {'hits': {'hits': self._hits()[start:start + size]}}
+
+    def scroll(self, **kwargs):
+        self.calls.append(('scroll', kwargs))
+        return self._scroll_page(int(kwargs['body']['scroll_id']), self.scroll_size)
+
+    def _hits(self):
+        return [{'_id': str(i), '_source': dict(doc), 'sort': [i]} for i, doc in enumerate(DOCS)]
+
+    def _scroll_page(self, start, size):
+        hits = self._hits()[start:start + size]
+        # filter_path drops the hits envelope of an empty page
+        resp = {'_scroll_id': str(start + size)}
+        if hits:
+            resp['hits'] = {'hits': hits}
+        return resp
+
+    def msearch(self, **kwargs):
+        self.calls.append(('msearch', kwargs))
+        bodies = kwargs['body'][1::2]
+        return {'responses': [self.search(body=body, size=body.get('size')) for body in bodies]}
+
+    def count(self, **kwargs):
+        self.calls.append(('count', kwargs))
+        return {'count': len(DOCS)}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def session():
+    session = SearchSession('localhost', 'user', 'password')
+    session.client = FakeClient()
+    return session
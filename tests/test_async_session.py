@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from opensearchpy.exceptions import TransportError
+
+from opensearchorm.async_session import AsyncQueryExecutor, AsyncSearchSession
+
+from conftest import FakeClient, UserLog
+
+
+class FakeAsyncSession:
+    def __init__(self):
+        self.client = FakeClient()
+
+    async def search(self, **kwargs):
+        return self.client.search(**kwargs)
+
+    async def count(self, **kwargs):
+        return self.client.count(**kwargs)
+
+
+def test_async_executor_shares_request_building():
+    session = FakeAsyncSession()
+    executor = AsyncQueryExecutor(UserLog, session).filter(method='GET').limit(2)
+
+    docs = asyncio.run(executor.fetch())
+    assert [doc.path for doc in docs] == ['/0', '/1']
+    assert asyncio.run(executor.count()) == 5
+    _, kwargs = session.client.calls[0]
+    assert kwargs['body']['query'] == {'bool': {'filter': [{'match_phrase': {'method': 'GET'}}]}}
+    assert not hasattr(executor, '_search')
+
+
+class FakeAsyncClient:
+    def __init__(self, errors):
+        self.client = FakeClient()
+        self.errors = iter(errors)
+
+    async def search(self, **kwargs):
+        error = next(self.errors, None)
+        if error:
+            raise error
+        return self.client.search(**kwargs)
+
+
+def test_async_throttled_requests_are_retried(monkeypatch):
+    pytest.importorskip('aiohttp')
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr('opensearchorm.async_session.asyncio.sleep', sleep)
+    session = AsyncSearchSession('localhost', 'user', 'password')
+    session.client = FakeAsyncClient([TransportError(429, 'too_many_requests')] * 2)
+
+    docs = asyncio.run(session.select(UserLog).limit(1).fetch())
+    assert [doc.path for doc in docs] == ['/0']
+    assert len(delays) == 2
+    assert 0.5 <= delays[0] <= 1.0 and 1.0 <= delays[1] <= 2.0
+
+    session.client = FakeAsyncClient([TransportError(400, 'parsing_exception')])
+    with pytest.raises(TransportError):
+        asyncio.run(session.select(UserLog).fetch())
@@ -0,0 +1,105 @@
+import pytest
+
+from opensearchorm.query import Contains, Expr, MatchPhrase, ModelQuery, Range
+
+from conftest import UserLog
+
+
+class Exists(Expr):
+    # a user expression overriding compile() without calling Expr.__init__
+    def __init__(self, field: str):
+        self.field = field
+
+    def compile(self):
+        return {'exists': {'field': self.field}}
+
+
+class Phrase(MatchPhrase):
+    def __init__(self, field: str, value: str):
+        self.field = field
+        self.value = value
+
+
+def test_compile_returns_a_fresh_body():
+    query = ModelQuery(UserLog).filter(path='/0')
+    body = query.compile()
+    body['bool']['filter'].clear()
+
+    assert query.compile() == {'bool': {'filter': [{'match_phrase': {'path': '/0'}}]}}
+
+
+def test_cached_body_is_reused_until_clauses_are_added():
+    query = ModelQuery(UserLog).filter(path='/0')
+    body = query._cached_compile()
+    assert query._cached_compile() is body
+
+    query.exclude(Exists('user'))
+    assert query._cached_compile() == {
+        'bool': {
+            'must_not': [{'exists': {'field': 'user'}}],
+            'filter': [{'match_phrase': {'path': '/0'}}],
+        }
+    }
+
+
+def test_cached_body_follows_nested_queries():
+    inner = ModelQuery(UserLog).filter(path='/0')
+    outer = ModelQuery(UserLog).union(inner)
+    outer._cached_compile()
+
+    inner.filter(method='GET')
+    assert outer._cached_compile() == outer.compile()
+    assert outer._cached_compile()['bool']['should'][0]['bool']['filter'][1] == {'match_phrase': {'method': 'GET'}}
+
+
+def test_leaf_is_recompiled_after_assignment():
+    expr = Range('latency', (1, 2))
+    assert expr.compile() == {'range': {'latency': {'gte': 1, 'lte': 2}}}
+
+    expr.right_open = True
+    assert expr.compile() == {'range': {'latency': {'gte': 1, 'lt': 2}}}
+
+
+def test_leaf_values_are_frozen():
+    values = ['/0']
+    expr = Contains('path', values)
+    expr.compile()
+    values.append('/1')
+
+    assert expr.values == ('/0',)
+    assert len(expr.compile()['bool']['should']) == 1
+
+
+def test_subclass_without_super_init():
+    assert Phrase('path', '/0').compile() == {'match_phrase': {'path': '/0'}}
+
+
+def test_in_accepts_collections():
+    for values in (['/0', '/1'], ('/0', '/1'), frozenset(['/0', '/1'])):
+        body = ModelQuery(UserLog).filter(path__in=values).compile()
+        assert sorted(body['bool']['filter'][0]['terms']['path']) == ['/0', '/1']
+
+    body = ModelQuery(UserLog).filter(path__in='/0').compile()
+    assert body['bool']['filter'][0] == {'terms': {'path': ['/0']}}
+
+
+def test_default_fields_is_a_fresh_list():
+    fields = UserLog.default_fields()
+    assert fields == ['method', 'path', 'created']
+
+    fields.append('extra')
+    assert UserLog.default_fields() == ['method', 'path', 'created']
+
+
+def test_unknown_field_is_rejected():
+    for name in ('pth', 'pth__gte', 'path__between'):
+        with pytest.raises(AssertionError, match=f'check field name: {name}'):
+            ModelQuery(UserLog).filter(**{name: 1})
+
+
+def test_valid_fields_is_a_set():
+    fields = ModelQuery(UserLog).valid_fields
+    assert fields == {'method', 'path', 'created'}
+
+    fields.add('extra')
+    assert ModelQuery(UserLog).valid_fields == {'method', 'path', 'created'}
@@ -0,0 +1,36 @@
+import pytest
+from opensearchpy.exceptions import SerializationError
+
+from opensearchorm.aggs import Sum, Terms
+from opensearchorm.serializer import OrjsonSerializer, default_serializer
+
+orjson = pytest.importorskip('orjson')
+
+
+def test_default_serializer_uses_orjson():
+    assert isinstance(default_serializer(), OrjsonSerializer)
+
+
+def test_dumps_aggregations_with_integer_depth_keys():
+    body = {'aggs': Terms('method').nested(Sum('latency')).compile()}
+
+    dumped = OrjsonSerializer().dumps(body)
+    assert isinstance(dumped, str)
+    assert orjson.loads(dumped)['aggs']['1']['aggs']['2'] == {'sum': {'field': 'latency'}}
+
+
+def test_dumps_returns_str_for_msearch_bodies():
+    serializer = OrjsonSerializer()
+    lines = [serializer.dumps(line) for line in ({'index': 'a'}, {'query': {'match_all': {}}})]
+
+    assert '\n'.join(lines) == '{"index":"a"}\n{"query":{"match_all":{}}}'
+    assert serializer.dumps('{"already": "json"}') == '{"already": "json"}'
+
+
+def test_errors_are_wrapped():
+    serializer = OrjsonSerializer()
+
+    with pytest.raises(SerializationError):
+        serializer.loads('{not json')
+    with pytest.raises(SerializationError):
+        serializer.dumps({'value': object()})
@@ -0,0 +1,263 @@
+from datetime import datetime
+import logging
+import threading
+import time
+
+import pytest
+from opensearchpy.exceptions import TransportError
+
+from opensearchorm import BaseModel, SearchSession
+from opensearchorm.session import _client_key, client_defaults
+from opensearchorm.utils import TTLCache
+
+from conftest import FakeClient, UserLog
+
+
+def test_iter_fetch_pages_until_exhausted(session):
+    docs = list(session.select(UserLog).iter_fetch(page_size=2, tiebreaker='path'))
+
+    assert [doc.path for doc in docs] == ['/0', '/1', '/2', '/3', '/4']
+    calls = [kwargs for _, kwargs in session.client.calls]
+    assert [c['size'] for c in calls] == [2, 2, 2]
+    assert [c['body'].get('search_after') for c in calls] == [None, [1], [3]]
+
+
+def test_iter_fetch_limit_caps_total(session):
+    docs = list(session.select(UserLog).limit(3).iter_fetch(page_size=2, tiebreaker='path'))
+
+    assert len(docs) == 3
+    assert [kwargs['size'] for _, kwargs in session.client.calls] == [2, 1]
+
+
+def test_iter_fetch_adds_tiebreaker(session):
+    list(session.select(UserLog).order_by('-created').iter_fetch(tiebreaker='path'))
+    list(session.select(UserLog).order_by('created', 'path').iter_fetch(tiebreaker='path'))
+    list(session.select(UserLog).order_by('path').iter_fetch())
+
+    sorts = [kwargs['body']['sort'] for _, kwargs in session.client.calls]
+    assert sorts == [
+        [{'created': 'desc'}, {'path': 'asc'}],
+        [{'created': 'asc'}, {'path': 'asc'}],
+        [{'path': 'asc'}],
+    ]
+
+
+def test_iter_fetch_needs_a_sort(session):
+    with pytest.raises(ValueError):
+        next(session.select(UserLog).iter_fetch())
+
+
+def test_iter_fetch_keeps_sort_in_filter_path(session):
+    list(session.select(UserLog).iter_fetch(page_size=2, tiebreaker='path', filter_path='hits.hits._id'))
+
+    assert session.client.calls[0][1]['filter_path'] == 'hits.hits._id,hits.hits.sort'
+
+
+def test_fetch_trims_response_with_filter_path(session):
+    session.select(UserLog).fetch()
+    session.select(UserLog).fetch_fields(['path'], filter_path='hits.total')
+
+    filter_paths = [kwargs['filter_path'] for _, kwargs in session.client.calls]
+    assert filter_paths == ['hits.hits._source', 'hits.total']
+
+
+def test_fetch_without_matches(session):
+    # filter_path leaves an empty object when there are no hits
+    session.client.search = lambda **kwargs: {}
+
+    assert session.select(UserLog).fetch() == []
+
+
+def test_raw_returns_source_dicts(session):
+    docs = session.select(UserLog).raw().limit(2).fetch()
+
+    assert docs == [
+        {'method': 'GET', 'path': '/0', 'created': '2022-09-01T00:00:00'},
+        {'method': 'GET', 'path': '/1', 'created': '2022-09-01T00:00:00'},
+    ]
+
+
+class AccessPath(BaseModel):
+    __index__ = 'access_path-*'
+
+    path: str
+
+
+def test_multi_select_sends_one_msearch(session):
+    logs, paths = session.multi_select([
+        (UserLog, {'method': 'GET'}),
+        (AccessPath, None),
+    ])
+
+    assert [type(doc) for doc in logs] == [UserLog] * 5
+    assert [doc.path for doc in paths] == ['/0', '/1', '/2', '/3', '/4']
+    api, kwargs = session.client.calls[0]
+    assert api == 'msearch'
+    assert kwargs['body'][0] == {'index': 'user_access_log-*'}
+    assert kwargs['body'][1]['query'] == {'bool': {'filter': [{'match_phrase': {'method': 'GET'}}]}}
+    assert kwargs['body'][2] == {'index': 'access_path-*'}
+
+
+def test_throttled_requests_are_retried(session, monkeypatch):
+    delays = []
+    monkeypatch.setattr('opensearchorm.session.time.sleep', delays.append)
+    count = session.client.count
+    responses = iter([TransportError(429, 'too_many_requests'), TransportError(429, 'too_many_requests')])
+
+    def throttled_count(**kwargs):
+        error = next(responses, None)
+        if error:
+            raise error
+        return count(**kwargs)
+
+    session.client.count = throttled_count
+
+    assert session.select(UserLog).count() == 5
+    assert len(delays) == 2
+    assert 0.5 <= delays[0] <= 1.0 and 1.0 <= delays[1] <= 2.0
+
+
+def test_other_errors_are_not_retried(session):
+    def bad_request(**kwargs):
+        raise TransportError(400, 'parsing_exception')
+
+    session.client.count = bad_request
+
+    with pytest.raises(TransportError):
+        session.select(UserLog).count()
+
+
+def test_client_key():
+    assert _client_key('localhost', 'user', 'password', {'headers': {'a': 1}}) != _client_key(
+        'localhost', 'user', 'password', {'headers': (('a', 1),)}
+    )
+    assert _client_key('localhost', 'user', 'password', {'headers': {1: 'a', 'b': 2}}) is None
+    assert _client_key('localhost', 'user', 'password', {'ca_certs': {'a': []}}) is not None
+
+
+def test_dispose_keeps_shared_client_until_last_session(monkeypatch):
+    monkeypatch.setattr(SearchSession, '_create_client', staticmethod(lambda *args, **kwargs: FakeClient()))
+    first = SearchSession('dispose-host', 'user', 'password')
+    second = SearchSession('dispose-host', 'user', 'password')
+    assert first.client is second.client
+
+    first.dispose()
+    first.dispose()
+    assert not second.client.closed
+    third = SearchSession('dispose-host', 'user', 'password')
+    assert third.client is second.client
+
+    third.dispose()
+    second.dispose()
+    assert second.client.closed
+    assert SearchSession('dispose-host', 'user', 'password').client is not second.client
+
+
+def test_cached_responses_are_copies(session):
+    session._response_cache = TTLCache(60)
+    first = session.select(UserLog).fetch_fields(['path'])
+    first[0]['path'] = '/changed'
+
+    assert session.select(UserLog).fetch_fields(['path'])[0]['path'] == '/0'
+    assert len(session.client.calls) == 1
+
+
+def test_query_is_logged_for_every_request(session, caplog):
+    executor = session.select(UserLog).filter(path='/0')
+    with caplog.at_level(logging.DEBUG, logger='opensearchorm.session'):
+        executor.count()
+        executor.fetch()
+
+    assert sum(record.getMessage().startswith('query:') for record in caplog.records) == 2
+
+
+def test_scroll_yields_pages_in_order(session):
+    pages = list(session.select(UserLog).limit(2).scroll('1m'))
+
+    assert [[doc.path for doc in page] for page in pages] == [['/0', '/1'], ['/2', '/3'], ['/4'], []]
+    assert [api for api, _ in session.client.calls] == ['search', 'scroll', 'scroll', 'scroll']
+
+
+def test_scroll_raises_prefetch_errors(session):
+    def failing_scroll(**kwargs):
+        raise TransportError(500, 'search_phase_execution_exception')
+
+    session.client.scroll = failing_scroll
+    pages = session.select(UserLog).limit(2).scroll('1m')
+
+    assert len(next(pages)) == 2
+    with pytest.raises(TransportError):
+        next(pages)
+
+
+def test_scroll_close_waits_for_prefetch(session):
+    finished = []
+    scroll = session.client.scroll
+
+    def slow_scroll(**kwargs):
+        time.sleep(0.05)
+        finished.append(kwargs['body']['scroll_id'])
+        return scroll(**kwargs)
+
+    session.client.scroll = slow_scroll
+    threads = threading.active_count()
+    pages = session.select(UserLog).limit(2).scroll('1m')
+
+    assert len(next(pages)) == 2
+    pages.close()
+    assert finished == ['2']
+    assert threading.active_count() == threads
+
+
+def test_client_defaults_pool_size():
+    assert client_defaults({})['maxsize'] == 32
+    assert client_defaults({'maxsize': 4})['maxsize'] == 4
+
+
+def test_client_defaults_accept_encoding():
+    assert client_defaults({})['headers'] == {'accept-encoding': 'gzip,deflate'}
+
+    headers = {'Accept-Encoding': 'identity', 'x-opaque-id': 'etl'}
+    kwargs = {'headers': headers, 'http_compress': False}
+    assert client_defaults(kwargs)['headers'] == headers
+    assert client_defaults(kwargs)['http_compress'] is False
+    assert kwargs == {'headers': headers, 'http_compress': False}
+
+
+def test_validate_false_skips_coercion(session):
+    executor = session.select(UserLog).limit(2)
+    fetched = executor.fetch(validate=False)
+    scrolled = next(executor.scroll('1m', validate=False))
+    [batched] = session.fetch_many([executor], validate=False)
+
+    for docs in (fetched, scrolled, batched):
+        assert [type(doc) for doc in docs] == [UserLog, UserLog]
+        assert docs[0].created == '2022-09-01T00:00:00'
+    assert isinstance(executor.fetch()[0].created, datetime)
+
+
+def test_fetch_many_without_executors(session):
+    assert session.fetch_many([]) == []
+    assert session.client.calls == []
+
+
+def test_fetch_many_raises_failed_sub_search(session):
+    def msearch(**kwargs):
+        error = {'type': 'index_not_found_exception', 'reason': 'no such index'}
+        return {'responses': [{'hits': {'hits': []}}, {'error': error, 'status': 404}]}
+
+    session.client.msearch = msearch
+    executors = [session.select(UserLog), session.select(UserLog)]
+
+    with pytest.raises(TransportError) as info:
+        session.fetch_many(executors)
+    assert info.value.status_code == 404
+    assert info.value.error == 'index_not_found_exception'
+
+
+def test_model_without_index_is_rejected(session):
+    class Unindexed(BaseModel):
+        path: str
+
+    with pytest.raises(TypeError, match='model has no index'):
+        session.select(Unindexed)
@@ -0,0 +1,101 @@
+import time
+
+from opensearchorm.aggs import Cardinality, Sum, Terms
+from opensearchorm.utils import TTLCache, compile_aggregations_parser, parse_aggregations
+
+
+def _terms(*buckets):
+    return {'buckets': list(buckets)}
+
+
+def _bucket(key, doc_count, child=None, depth=1):
+    bucket = {'key': key, 'doc_count': doc_count}
+    if child is not None:
+        bucket[str(depth + 1)] = child
+    return bucket
+
+
+def test_parse_nested_aggregations():
+    # Terms -> Terms -> Sum
+    data = {
+        '1': _terms(
+            _bucket('GET', 6, _terms(
+                _bucket('/a', 4, {'value': 12.5}, depth=2),
+                _bucket('/b', 2, {'value': 0}, depth=2),
+            )),
+            _bucket('POST', 3, _terms()),
+            _bucket('PUT', 1, _terms(_bucket('/c', 1, {'value': 0.0}, depth=2))),
+        )
+    }
+    expected = {'GET': {'/a': 12.5, '/b': 2}, 'POST': 3, 'PUT': {'/c': 1}}
+    aggs = Terms('method').nested(Terms('path').nested(Sum('latency')))
+
+    assert parse_aggregations(data) == expected
+    assert compile_aggregations_parser(aggs)(data) == expected
+    assert list(parse_aggregations(data)) == ['GET', 'POST', 'PUT']
+
+
+def test_compiled_parser_matches_parse_aggregations():
+    data = {
+        '1': _terms(
+            _bucket('a', 3, _terms(_bucket('x', 2), _bucket('y', 1))),
+            _bucket('b', 4, _terms()),
+            _bucket('c', 5),
+        )
+    }
+    parser = compile_aggregations_parser(Terms('path').nested(Terms('user')))
+
+    assert parser(data) == parse_aggregations(data) == {'a': {'x': 2, 'y': 1}, 'b': 4, 'c': 5}
+
+
+def test_compiled_parser_metric():
+    data = {'1': {'value': 7}}
+
+    assert compile_aggregations_parser(Cardinality('path'))(data) == parse_aggregations(data) == 7
+    assert compile_aggregations_parser(Sum('latency'))({}) is None
+
+
+def test_compiled_parser_is_cached_by_shape():
+    assert compile_aggregations_parser(Terms('path')) is compile_aggregations_parser(Terms('user', 10))
+    assert compile_aggregations_parser(Terms('path')) is not compile_aggregations_parser(Sum('latency'))
+
+
+def test_ttl_cache_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache(10)
+    cache.set('a', 1)
+
+    now[0] = 110.0
+    assert cache.get('a') == 1
+    now[0] = 110.1
+    assert cache.get('a') is None
+    assert cache.get('a', 'missing') == 'missing'
+
+
+def test_ttl_cache_evicts_expired_then_oldest(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache(10, maxsize=2)
+    cache.set('a', 1)
+    now[0] = 105.0
+    cache.set('b', 2)
+
+    now[0] = 111.0
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (None, 2, 3)
+
+    cache.set('d', 4)
+    assert (cache.get('b'), cache.get('c'), cache.get('d')) == (None, 3, 4)
+
+
+def test_aggregation_body_follows_reassignment():
+    terms = Terms('path')
+    assert terms.compile()[1]['terms'] == {'field': 'path', 'size': 100}
+    terms.max_buckets = 5
+    assert terms.compile()[1]['terms'] == {'field': 'path', 'size': 5}
+
+    metric = Sum('latency')
+    assert metric.compile(2) == {2: {'sum': {'field': 'latency'}}}
+    metric.field = 'bytes'
+    assert metric.compile(2) == {2: {'sum': {'field': 'bytes'}}}